@@ -1,8 +1,9 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import os
 
-from django.contrib.staticfiles.finders import get_finders
-import sass
+# The staticfiles finders and libsass are imported within each function rather
+# than at the top of this module, so that simply having `django_sass` in
+# INSTALLED_APPS does not load them into every process.
 
 
 def find_static_paths() -> List[str]:
@@ -12,6 +13,8 @@ def find_static_paths() -> List[str]:
     :returns:
         List of paths containing static files.
     """
+    from django.contrib.staticfiles.finders import get_finders
+
     found_paths = []
     for finder in get_finders():
         if hasattr(finder, "storages"):
@@ -29,6 +32,8 @@ def find_static_scss() -> List[str]:
     :returns:
         List of paths of static scss/sass files.
     """
+    from django.contrib.staticfiles.finders import get_finders
+
     scss_files = []
     for finder in get_finders():
         for path, storage in finder.list([]):
@@ -45,7 +50,8 @@ def compile_sass(
     precision: int = None,
     source_map: bool = False,
     include_paths: List[str] = None,
-) -> None:
+    return_source_map: bool = False,
+) -> Dict[str, Tuple[str, Optional[str]]]:
     """
     Calls sass.compile() within context of Django's known static file paths,
     and writes output CSS and/or sourcemaps to file.
@@ -62,34 +68,59 @@ def compile_sass(
     :param bool source_map:
         If True, write a source map along with the output CSS file.
         Only valid when `inpath` is a file.
+    :param bool return_source_map:
+        If True, generate a source map for each output CSS file and return it,
+        even if it is not written.
     :returns:
-        None
+        Dict of each output CSS file path to a tuple of its compiled CSS and
+        source map. The source map is None unless `source_map` or
+        `return_source_map` is True.
     """
+    import sass
 
     # If include paths are not specified, use Django static paths
     include_paths = include_paths or find_static_paths()
 
-    # Additional sass args that must be figured out.
-    sassargs = {}  # type: Dict[str, object]
+    # List of (input file, output file) to compile.
+    files = []  # type: List[Tuple[str, str]]
+
+    # Newline mode used when writing css.
+    newline = None  # type: Optional[str]
 
     # Handle input directories.
     if os.path.isdir(inpath):
         # Assume outpath is also a dir, or make it.
         if not os.path.exists(outpath):
             os.makedirs(outpath)
-        if os.path.isdir(outpath):
-            sassargs.update({"dirname": (inpath, outpath)})
-        else:
+        if not os.path.isdir(outpath):
             raise NotADirectoryError(
                 "Output path must also be a directory when input path is a directory."
             )
 
+        # Compile every non-partial file, mirroring the directory structure
+        # of inpath within outpath.
+        for dirpath, dirnames, filenames in os.walk(inpath):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.startswith("_"):
+                    continue
+                if not (
+                    filename.endswith(".scss") or filename.endswith(".sass")
+                ):
+                    continue
+                infile = os.path.join(dirpath, filename)
+                outfile = os.path.join(outpath, os.path.relpath(infile, inpath))
+                files.append((infile, outfile[:-5] + ".css"))
+
+        # Source maps are only written when the input is a file.
+        source_map = False
+
+        # Write newlines as-is, the same as sass.compile(dirname=...).
+        newline = ""
+
     # Handle input files.
-    outfile = None
     if os.path.isfile(inpath):
 
-        sassargs.update({"filename": inpath})
-
         # If outpath does not exist, guess if it should be a dir and create it.
         if not os.path.exists(outpath):
             if not outpath.endswith(".css"):
@@ -106,38 +137,57 @@ def compile_sass(
             )
         else:
             outfile = outpath
+        files.append((inpath, outfile))
+
+    compiled = {}  # type: Dict[str, Tuple[str, Optional[str]]]
+    for infile, outfile in files:
+        map_outfile = outfile + ".map"
+
+        # Additional sass args that must be figured out.
+        sassargs = {}  # type: Dict[str, object]
+
+        # Create source map if specified. It is only referenced from the css
+        # if it is written.
+        if source_map or return_source_map:
+            sassargs.update(
+                {
+                    "source_map_filename": map_outfile,
+                    "omit_source_map_url": not source_map,
+                }
+            )
 
-        # Create source map if specified.
-        if source_map:
-            sassargs.update({"source_map_filename": outfile + ".map"})
-
-    # Compile the sass.
-    rval = sass.compile(
-        output_style=output_style,
-        precision=precision,
-        include_paths=include_paths,
-        **sassargs,
-    )
-
-    # Write output.
-    # sass.compile() will return None if used with dirname.
-    # If used with filename, it will return a string of file contents.
-    if rval and outfile:
-        # If we got a css and sourcemap tuple, write the sourcemap.
+        # Compile the sass.
+        rval = sass.compile(
+            filename=infile,
+            output_style=output_style,
+            precision=precision,
+            include_paths=include_paths,
+            **sassargs,
+        )
+
+        # If we got a css and sourcemap tuple, split it.
+        smap = None  # type: Optional[str]
         if isinstance(rval, tuple):
-            map_outfile = outfile + ".map"
+            css, smap = rval
+        else:
+            css = rval
+        compiled[outfile] = (css, smap)
+
+        # Write the sourcemap if specified.
+        if source_map and smap:
             outfile_dir = os.path.dirname(map_outfile)
             if not os.path.exists(outfile_dir):
                 os.makedirs(outfile_dir, exist_ok=True)
             file = open(map_outfile, "w", encoding="utf8")
-            file.write(rval[1])
+            file.write(smap)
             file.close()
-            rval = rval[0]
 
         # Write the outputted css to file.
         outfile_dir = os.path.dirname(outfile)
         if not os.path.exists(outfile_dir):
             os.makedirs(outfile_dir, exist_ok=True)
-        file = open(outfile, "w", encoding="utf8")
-        file.write(rval)
+        file = open(outfile, "w", encoding="utf8", newline=newline)
+        file.write(css)
         file.close()
+
+    return compiled
@@ -1,12 +1,19 @@
-from typing import Dict
+from typing import Dict, Optional, Tuple
+import json
 import os
 import sys
 import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 import sass
 
 from django_sass import compile_sass, find_static_scss
+from django_sass.report import (
+    METRICS,
+    build_report,
+    check_budget,
+    format_report,
+)
 
 
 class Command(BaseCommand):
@@ -52,6 +59,50 @@ class Command(BaseCommand):
             default=False,
             help="Watch input path and re-generate css files when scss files are changed.",
         )
+        parser.add_argument(
+            "--report",
+            dest="report",
+            action="store_true",
+            default=False,
+            help="Print the size of each css file, broken down by source file.",
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            dest="baseline",
+            default=None,
+            help="A report json file to compare sizes against. Implies --report.",
+        )
+        parser.add_argument(
+            "--save-report",
+            type=str,
+            dest="save_report",
+            default=None,
+            help="Write the report to a json file, for use with --baseline. Implies --report.",
+        )
+        parser.add_argument(
+            "--budget",
+            type=int,
+            dest="budget",
+            default=None,
+            help="Fail if any css file is larger than this many bytes. Implies --report.",
+        )
+        parser.add_argument(
+            "--budget-metric",
+            type=str,
+            dest="budget_metric",
+            default="raw",
+            choices=METRICS,
+            help="Which size --budget applies to. Defaults to raw.",
+        )
+        parser.add_argument(
+            "--marginal",
+            dest="marginal",
+            action="store_true",
+            default=False,
+            help="Also report how much each source file adds to the gzip and brotli size. "
+            "Slower. Implies --report.",
+        )
 
     def handle(self, *args, **options) -> None:
         """
@@ -65,6 +116,19 @@ class Command(BaseCommand):
         o_srcmap = options["g"]
         o_precision = options["p"]
         o_style = options["t"]
+        o_report = (
+            options["report"]
+            or options["baseline"] is not None
+            or options["save_report"] is not None
+            or options["budget"] is not None
+            or options["marginal"]
+        )
+
+        if o_report and options["watch"]:
+            raise CommandError(
+                "--report, --baseline, --save-report, --budget, and "
+                "--marginal cannot be used with --watch."
+            )
 
         # Watch files for changes if specified.
         if options["watch"]:
@@ -110,11 +174,78 @@ class Command(BaseCommand):
 
         # Write css.
         self.stdout.write("Writing css...")
-        compile_sass(
+        compiled = compile_sass(
             inpath=o_inpath,
             outpath=o_outpath,
             output_style=o_style,
             precision=o_precision,
             source_map=o_srcmap,
+            return_source_map=o_report,
         )
         self.stdout.write("Done.")
+
+        # Report output sizes if specified.
+        if o_report:
+            self.report(
+                compiled=compiled,
+                outpath=o_outpath,
+                baseline_path=options["baseline"],
+                save_path=options["save_report"],
+                budget=options["budget"],
+                budget_metric=options["budget_metric"],
+                marginal=options["marginal"],
+            )
+
+    def report(
+        self,
+        compiled: Dict[str, Tuple[str, Optional[str]]],
+        outpath: str,
+        baseline_path: Optional[str] = None,
+        save_path: Optional[str] = None,
+        budget: Optional[int] = None,
+        budget_metric: str = "raw",
+        marginal: bool = False,
+    ) -> None:
+        """
+        Prints the size of each compiled css file attributed to its source
+        files, and enforces the size budget.
+        """
+        baseline = None  # type: Optional[Dict[str, Dict]]
+        if baseline_path:
+            try:
+                with open(baseline_path, encoding="utf8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(
+                    "Could not read baseline %s: %s" % (baseline_path, exc)
+                )
+
+        report = build_report(
+            compiled=compiled, outpath=outpath, marginal=marginal
+        )
+
+        for line in format_report(report, baseline):
+            self.stdout.write(line)
+
+        if save_path:
+            try:
+                with open(save_path, "w", encoding="utf8") as f:
+                    json.dump(report, f, indent=2)
+            except (OSError, ValueError) as exc:
+                raise CommandError(
+                    "Could not write report %s: %s" % (save_path, exc)
+                )
+
+        if budget is not None:
+            try:
+                over = check_budget(report, budget, budget_metric)
+            except ValueError as exc:
+                raise CommandError(
+                    "%s Install django-sass[report] to measure brotli sizes."
+                    % exc
+                )
+            if over:
+                raise CommandError(
+                    "Size budget of %d %s bytes exceeded by: %s"
+                    % (budget, budget_metric, ", ".join(over))
+                )
@@ -0,0 +1,389 @@
+from typing import Dict, List, Optional, Tuple
+import gzip
+import json
+import os
+
+from django_sass import find_static_paths
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+
+# Base64 alphabet used by source map VLQ encoding.
+VLQ_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+VLQ_VALUES = {c: i for i, c in enumerate(VLQ_CHARS)}
+
+# Name used for output bytes which do not map back to any source file.
+UNMAPPED = "(unmapped)"
+
+# Sizes which can be reported and budgeted.
+METRICS = ("raw", "gzip", "brotli")
+
+# Compression levels used for marginal sizes, which compress the file once
+# per source. Whole file sizes always use the maximum levels.
+MARGINAL_GZIP_LEVEL = 6
+MARGINAL_BROTLI_QUALITY = 5
+
+
+def decode_vlq(segment: str) -> List[int]:
+    """
+    Decodes a single Base64 VLQ segment from a source map.
+
+    :param str segment:
+        One comma separated segment from the source map `mappings` field.
+    :returns:
+        List of (relative) integer values contained in the segment.
+    """
+    values = []
+    shift = 0
+    value = 0
+    for char in segment:
+        digit = VLQ_VALUES[char]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            negative = value & 1
+            value >>= 1
+            values.append(-value if negative else value)
+            shift = 0
+            value = 0
+    return values
+
+
+def decode_mappings(mappings: str) -> List[List[Tuple[int, Optional[int]]]]:
+    """
+    Decodes the `mappings` field of a version 3 source map.
+
+    :param str mappings:
+        The `mappings` field from a source map.
+    :returns:
+        One list per generated line, containing tuples of
+        (generated column, source index). Source index is None for segments
+        which do not map to any source.
+    """
+    lines = []
+    source = 0
+    for line in mappings.split(";"):
+        segments = []  # type: List[Tuple[int, Optional[int]]]
+        column = 0
+        for segment in line.split(","):
+            if not segment:
+                continue
+            values = decode_vlq(segment)
+            column += values[0]
+            if len(values) > 1:
+                source += values[1]
+                segments.append((column, source))
+            else:
+                segments.append((column, None))
+        lines.append(segments)
+    return lines
+
+
+def compressed_sizes(
+    data: bytes, gzip_level: int = 9, brotli_quality: int = 11
+) -> Dict[str, Optional[int]]:
+    """
+    Measures raw, gzip, and brotli size of the data.
+
+    :param bytes data:
+        Data to measure.
+    :param int gzip_level:
+        Gzip compression level, from 0 to 9.
+    :param int brotli_quality:
+        Brotli compression quality, from 0 to 11.
+    :returns:
+        Dict of sizes in bytes. The brotli size is None if the optional
+        `brotli` package is not installed.
+    """
+    return {
+        "raw": len(data),
+        "gzip": len(gzip.compress(data, gzip_level)),
+        "brotli": (
+            len(brotli.compress(data, quality=brotli_quality))
+            if brotli
+            else None
+        ),
+    }
+
+
+def split_by_source(
+    css: str, source_map: Optional[str]
+) -> List[Tuple[str, str]]:
+    """
+    Splits compiled CSS into the pieces of text generated by each source file.
+
+    Each output character is attributed to the source of the closest mapping
+    preceding it. A leading byte order mark, output before the first mapping,
+    and output after the last mapped line (such as the sourceMappingURL
+    comment) are attributed to `UNMAPPED`.
+
+    :param str css:
+        Compiled CSS.
+    :param str source_map:
+        JSON source map generated alongside the CSS. If None, all of the CSS
+        is attributed to `UNMAPPED`.
+    :returns:
+        List of (source path as it appears in the source map, text) tuples,
+        in output order. Joining the text gives back `css`.
+    """
+    if source_map is None:
+        return [(UNMAPPED, css)] if css else []
+
+    smap = json.loads(source_map)
+    sources = smap.get("sources", [])
+    mappings = decode_mappings(smap.get("mappings", ""))
+
+    chunks = []  # type: List[Tuple[str, str]]
+    current = UNMAPPED
+
+    def add(text: str) -> None:
+        if text:
+            chunks.append((current, text))
+
+    # libsass adds a byte order mark to compressed output containing
+    # non-ASCII characters, which source map columns do not count.
+    if css.startswith("\ufeff"):
+        add("\ufeff")
+        css = css[1:]
+
+    last_mapped = max(
+        (lineno for lineno, segments in enumerate(mappings) if segments),
+        default=-1,
+    )
+
+    css_lines = css.split("\n")
+    for lineno, line in enumerate(css_lines):
+        if lineno < len(css_lines) - 1:
+            line += "\n"
+        if lineno > last_mapped:
+            current = UNMAPPED
+            add(line)
+            continue
+        pos = 0
+        for column, source in mappings[lineno]:
+            add(line[pos:column])
+            pos = max(pos, column)
+            if source is not None and source < len(sources):
+                current = sources[source]
+            else:
+                current = UNMAPPED
+        add(line[pos:])
+
+    return chunks
+
+
+def _display_path(path: str, include_paths: List[str]) -> str:
+    """
+    Shortens an absolute path to be relative to the include path containing
+    it, or the current directory if no include path contains it.
+    """
+    for include_path in include_paths:
+        include_path = os.path.abspath(include_path)
+        if path.startswith(include_path + os.sep):
+            return os.path.relpath(path, include_path).replace(os.sep, "/")
+    return os.path.relpath(path).replace(os.sep, "/")
+
+
+def build_report(
+    compiled: Dict[str, Tuple[str, Optional[str]]],
+    outpath: str,
+    include_paths: Optional[List[str]] = None,
+    marginal: bool = False,
+) -> Dict[str, Dict]:
+    """
+    Attributes the size of each compiled CSS file to the source files it was
+    generated from.
+
+    The raw size of a source is the number of output bytes it generated.
+
+    :param dict compiled:
+        Output of `compile_sass`, called with `return_source_map=True`.
+    :param str outpath:
+        The `outpath` given to `compile_sass`.
+    :param list include_paths:
+        The `include_paths` given to `compile_sass`, used to shorten source
+        paths. Defaults to Django static paths.
+    :param bool marginal:
+        If True, also measure the marginal gzip and brotli size of each
+        source: how much smaller the compressed file would be without that
+        source's output. Marginal sizes do not add up to the compressed size
+        of the whole file. This compresses each file once per source, so
+        marginal sizes use lower compression levels.
+    :returns:
+        Dict keyed by output CSS path relative to `outpath`. Each value
+        contains "raw", "gzip", and "brotli" sizes of the whole file, and
+        "sources": a dict of source path to its "raw", "gzip", and "brotli"
+        sizes. Compressed sizes of sources are None unless `marginal` is True.
+    """
+
+    # If include paths are not specified, use Django static paths
+    include_paths = include_paths or find_static_paths()
+
+    # Key output files relative to outpath, so that reports can be compared
+    # regardless of where they were built.
+    if os.path.isdir(outpath):
+        outdir = outpath
+    else:
+        outdir = os.path.dirname(outpath)
+
+    report = {}  # type: Dict[str, Dict]
+    for outfile, (css, smap) in compiled.items():
+        map_dir = os.path.dirname(os.path.abspath(outfile + ".map"))
+        # Merge adjacent output of the same source, so that each source's
+        # output can be removed cheaply when measuring marginal sizes.
+        runs = []  # type: List[Tuple[str, List[str]]]
+        for src, text in split_by_source(css, smap):
+            if runs and runs[-1][0] == src:
+                runs[-1][1].append(text)
+            else:
+                runs.append((src, [text]))
+        chunks = [(src, "".join(texts).encode("utf8")) for src, texts in runs]
+        data = css.encode("utf8")
+        entry = compressed_sizes(data)  # type: Dict
+
+        # Group the output of each source, in order of first appearance.
+        raw = {}  # type: Dict[str, int]
+        for src, chunk in chunks:
+            raw[src] = raw.get(src, 0) + len(chunk)
+
+        if marginal:
+            whole = compressed_sizes(
+                data, MARGINAL_GZIP_LEVEL, MARGINAL_BROTLI_QUALITY
+            )
+
+        sources = {}  # type: Dict[str, Dict[str, Optional[int]]]
+        for src in raw:
+            sizes = {
+                "raw": raw[src],
+                "gzip": None,
+                "brotli": None,
+            }  # type: Dict[str, Optional[int]]
+            if marginal:
+                rest = compressed_sizes(
+                    b"".join([c for s, c in chunks if s != src]),
+                    MARGINAL_GZIP_LEVEL,
+                    MARGINAL_BROTLI_QUALITY,
+                )
+                for metric in ("gzip", "brotli"):
+                    whole_size = whole[metric]
+                    rest_size = rest[metric]
+                    if whole_size is not None and rest_size is not None:
+                        sizes[metric] = whole_size - rest_size
+            if src != UNMAPPED:
+                src = _display_path(
+                    os.path.normpath(os.path.join(map_dir, src)), include_paths
+                )
+            sources[src] = sizes
+
+        entry["sources"] = sources
+        key = os.path.relpath(outfile, outdir or os.curdir)
+        report[key.replace(os.sep, "/")] = entry
+
+    return report
+
+
+def _fmt_size(size: Optional[int]) -> str:
+    return "-" if size is None else str(size)
+
+
+def _fmt_delta(
+    size: Optional[int], base: Optional[int], has_baseline: bool
+) -> str:
+    if not has_baseline:
+        return ""
+    if base is None:
+        return "new"
+    return "%+d" % ((size or 0) - base)
+
+
+def format_report(
+    report: Dict[str, Dict], baseline: Optional[Dict[str, Dict]] = None
+) -> List[str]:
+    """
+    Formats a report from `build_report` as human readable lines.
+
+    :param dict report:
+        Report from `build_report`.
+    :param dict baseline:
+        Optional previously saved report. If provided, the change in raw size
+        of each file and source is shown, including files and sources which
+        are only in one of the two reports.
+    :returns:
+        List of lines of text.
+    """
+    has_baseline = baseline is not None
+    baseline = baseline or {}
+    row = "  {:>10} {:>10} {:>10} {:>10}  {}"
+    lines = []
+    outfiles = list(report) + [f for f in baseline if f not in report]
+    for outfile in outfiles:
+        entry = report.get(outfile, {})
+        base = baseline.get(outfile, {})
+        cur_sources = entry.get("sources", {})
+        base_sources = base.get("sources", {})
+        if not entry:
+            lines.append(outfile + " (not in current build)")
+        elif has_baseline and not base:
+            lines.append(outfile + " (not in baseline)")
+        else:
+            lines.append(outfile)
+        lines.append(row.format("raw", "gzip", "brotli", "delta", "source"))
+        srcs = sorted(cur_sources, key=lambda src: -cur_sources[src]["raw"])
+        srcs += [src for src in base_sources if src not in cur_sources]
+        for src, sizes in [(src, cur_sources.get(src, {})) for src in srcs]:
+            lines.append(
+                row.format(
+                    _fmt_size(sizes.get("raw")),
+                    _fmt_size(sizes.get("gzip")),
+                    _fmt_size(sizes.get("brotli")),
+                    _fmt_delta(
+                        sizes.get("raw"),
+                        base_sources.get(src, {}).get("raw"),
+                        has_baseline,
+                    ),
+                    src,
+                )
+            )
+        lines.append(
+            row.format(
+                _fmt_size(entry.get("raw")),
+                _fmt_size(entry.get("gzip")),
+                _fmt_size(entry.get("brotli")),
+                _fmt_delta(entry.get("raw"), base.get("raw"), has_baseline),
+                "total",
+            )
+        )
+        lines.append("")
+    return lines
+
+
+def check_budget(
+    report: Dict[str, Dict], budget: int, metric: str = "raw"
+) -> List[str]:
+    """
+    Finds output files which exceed a size budget.
+
+    :param dict report:
+        Report from `build_report`.
+    :param int budget:
+        Maximum size in bytes of each output CSS file.
+    :param str metric:
+        Which size to check against the budget. One of `METRICS`.
+    :returns:
+        List of output files larger than `budget`.
+    """
+    if metric not in METRICS:
+        raise ValueError("Unknown size metric: %s" % metric)
+    over = []
+    for outfile, entry in report.items():
+        if entry.get(metric) is None:
+            raise ValueError(
+                "%s size is not available for %s." % (metric, outfile)
+            )
+        if entry[metric] > budget:
+            over.append(outfile)
+    return over
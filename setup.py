@@ -26,6 +26,11 @@ setup(
         "django",
         "libsass",
     ],
+    extras_require={
+        "report": [
+            "brotli",
+        ],
+    },
     classifiers=[
         "Environment :: Web Environment",
         "Framework :: Django :: 2.0",